@@ -1,42 +1,94 @@
 #!/usr/bin/env python3
 import os
-import time
-import json
+import signal
+import asyncio
+import threading
 import datetime as dt
-from web3 import Web3
+import orjson
+import zstandard
+from web3 import AsyncWeb3, AsyncIPCProvider
 from hexbytes import HexBytes
 
-IPC_PATH    = '/data/geth-data/geth.ipc'
-OUTPUT_DIR  = '/root/mempool-dumps'
-INTERVAL    = 10  #seconds
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+IPC_PATH      = '/data/geth-data/geth.ipc'
+# largest IPC response accepted; web3's 20 MiB default drops a stressed node's txpool_content
+READ_BUFFER_LIMIT = 1 << 30  #bytes
+OUTPUT_DIR    = '/root/mempool-dumps'
+INTERVAL      = 10  #seconds
+QUEUE_SIZE    = 4   #snapshots waiting to be written before the sampler blocks
+# 'jsonl'   -> daily zstd JSON logs for shredder_script.py
+# 'parquet' -> already-shredded transactions/snapshots Parquet for shredded_to_parquet_converter.py --parquet-input
+OUTPUT_FORMAT = 'jsonl'
 
 # === SETUP ===
 os.makedirs(OUTPUT_DIR, exist_ok=True)
-w3 = Web3(Web3.IPCProvider(IPC_PATH))
 
-def to_plain(obj):
+# this run's zstd-compressed log file for today, kept open between snapshots and rotated on UTC date change
+_fh = {'date': None, 'f': None, 'path': None}
+_cctx = zstandard.ZstdCompressor(level=3, threads=2)
+
+# Parquet output mirrors the converter's SHREDDED_* schemas. This is the reference copy of the layout:
+# shredder_script.py --parquet repeats these settings, _to_str and the list flattening, so change both together
+TRANSACTION_FIELDS = [
+    'blockHash', 'blockNumber', 'from', 'gas', 'gasPrice', 'maxFeePerGas', 'maxPriorityFeePerGas',
+    'hash', 'input', 'nonce', 'to', 'transactionIndex', 'value', 'type'
+]
+SIGNATURE_FIELDS = ['chainId', 'v', 'r', 's', 'yParity']
+AUTHORIZATION_FIELDS = ['chainId', 'address', 'nonce', 'yParity', 'r', 's']
+# only low-cardinality columns are worth a dictionary; hashes, calldata and signatures are not
+PARQUET_DICTIONARY_COLUMNS = [
+    '_pool_status', '_original_source_file', '_snapshot_timestamp', 'type', 'chainId',
+    'snapshot_timestamp', 'original_source_file'
+]
+SNAPSHOT_ROWS_PER_GROUP = 360  #snapshot summaries buffered per Parquet row group (1h at 10s)
+# pool sizes move by small steps between snapshots, so store the differences
+SNAPSHOT_COLUMN_ENCODING = {'pending_count': 'DELTA_BINARY_PACKED', 'queued_count': 'DELTA_BINARY_PACKED'}
+
+# today's Parquet writers and buffered snapshot summary rows, rotated on UTC date change
+_pw = {'date': None, 'tx': None, 'snap': None, 'tx_path': None, 'snap_rows': []}
+# serializes writer-thread writes with close_writers() on shutdown
+_write_lock = threading.Lock()
+# set by close_writers(); a write still in flight at shutdown is dropped instead of opening new files
+_closed = threading.Event()
+
+if pa is not None:
+    TRANSACTION_SCHEMA = pa.schema(
+        [(f, pa.string()) for f in TRANSACTION_FIELDS]
+        + [('accessList', pa.list_(pa.string()))]
+        + [(f, pa.string()) for f in SIGNATURE_FIELDS]
+        + [('authorizationList', pa.list_(pa.struct([(f, pa.string()) for f in AUTHORIZATION_FIELDS])))]
+        + [('_snapshot_timestamp', pa.string()), ('_original_source_file', pa.string()), ('_pool_status', pa.string())]
+    )
+    SNAPSHOT_SCHEMA = pa.schema([
+        ('snapshot_timestamp', pa.string()),
+        ('pending_count', pa.int64()),
+        ('queued_count', pa.int64()),
+        ('original_source_file', pa.string())
+    ])
+
+def _encode(obj):
+    # orjson default hook: dict/list/str/int are encoded natively, so only
+    # HexBytes and web3 AttributeDict (has .items()) ever reach this
     if isinstance(obj, HexBytes):
         return obj.hex()
-    elif isinstance(obj, dict):
-        return {k: to_plain(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [to_plain(v) for v in obj]
-    # catch web3 AttributeDict (has .items())
     elif hasattr(obj, 'items'):
-        return {k: to_plain(v) for k, v in obj.items()}
+        return dict(obj)
     else:
-        return obj
+        return str(obj)
 
-def dump_once():
+async def dump_once(w3, queue):
     now = dt.datetime.now(dt.timezone.utc)
-    date = now.strftime('%Y-%m-%d')
-    fn   = os.path.join(OUTPUT_DIR, f'{date}.log')
 
     try:
         # full txpool snapshot
-        pool = w3.geth.txpool.content()
+        pool = await w3.geth.txpool.content()
         # pending / queued counts
-        st   = w3.geth.txpool.status() 
+        st   = await w3.geth.txpool.status() 
        # parse pending / queued
         def parse_count(x):
             if isinstance(x, str) and x.startswith('0x'):
@@ -47,7 +99,7 @@ def dump_once():
             'timestamp':     now.isoformat(),
             'pending_count': parse_count(st['pending']),
             'queued_count':  parse_count(st['queued']),
-            'snapshot':      to_plain(pool)
+            'snapshot':      pool
         }
     except Exception as e:
         record = {
@@ -55,13 +107,146 @@ def dump_once():
             'error':     str(e)
         }
 
-    # append to today's file
-    with open(fn, 'a') as f:
-        f.write(json.dumps(record) + "\n")
-    # log to stdout/stderr so you can see it in nohup.out
-    print(f"[{dt.datetime.utcnow().isoformat()}Z] wrote snapshot to {fn}", flush=True)
+    # hand off to the writer so the next RPC isn't held up by serialization/disk
+    await queue.put((now, record))
 
-if __name__ == '__main__':
+def _to_str(value):
+    # same text the converter gets when Spark reads the JSON value into a StringType column
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, HexBytes):
+        return value.hex()
+    if type(value) is int:
+        return str(value)
+    return orjson.dumps(value, default=_encode).decode()
+
+def _flush_snapshot_rows():
+    if _pw['snap_rows']:
+        _pw['snap'].write_batch(pa.RecordBatch.from_pylist(_pw['snap_rows'], schema=SNAPSHOT_SCHEMA))
+        _pw['snap_rows'] = []
+
+def close_writers():
+    with _write_lock:
+        _closed.set()
+        _close_writers()
+
+def _close_writers():
+    if _fh['f'] is not None:
+        _fh['f'].close()
+        _fh['f'] = _fh['date'] = None
+    if _pw['tx'] is not None:
+        _flush_snapshot_rows()
+        _pw['tx'].close()
+        _pw['snap'].close()
+        _pw['tx'] = _pw['snap'] = _pw['date'] = None
+
+def write_record_parquet(now, record):
+    date = now.strftime('%Y-%m-%d')
+
+    # one file pair per day and run; Parquet files can't be appended to once closed
+    if _pw['date'] != date:
+        _close_writers()
+        part = f"part-{now.strftime('%Y-%m-%dT%H%M%S')}.parquet"
+        paths = {}
+        for name in ('transactions', 'snapshots'):
+            partition_dir = os.path.join(OUTPUT_DIR, name, f'snapshot_date={date}')
+            os.makedirs(partition_dir, exist_ok=True)
+            paths[name] = os.path.join(partition_dir, part)
+        _pw['tx'] = pq.ParquetWriter(paths['transactions'], TRANSACTION_SCHEMA, compression='zstd',
+                                     use_dictionary=PARQUET_DICTIONARY_COLUMNS)
+        _pw['snap'] = pq.ParquetWriter(paths['snapshots'], SNAPSHOT_SCHEMA, compression='zstd',
+                                       use_dictionary=PARQUET_DICTIONARY_COLUMNS,
+                                       column_encoding=SNAPSHOT_COLUMN_ENCODING)
+        _pw['tx_path'] = paths['transactions']
+        _pw['date'] = date
+
+    ts = record['timestamp']
+    _pw['snap_rows'].append({
+        'snapshot_timestamp':   ts,
+        'pending_count':        record.get('pending_count', 0),
+        'queued_count':         record.get('queued_count', 0),
+        'original_source_file': _pw['tx_path']
+    })
+    if len(_pw['snap_rows']) >= SNAPSHOT_ROWS_PER_GROUP:
+        _flush_snapshot_rows()
+
+    # flatten sender -> nonce -> tx for both pools into one row per transaction
+    txs, statuses = [], []
+    for status in ('pending', 'queued'):
+        for nonces in (record.get('snapshot') or {}).get(status, {}).values():
+            for tx in nonces.values():
+                txs.append(tx)
+                statuses.append(status)
+    if txs:
+        columns = {f: [_to_str(tx.get(f)) for tx in txs] for f in TRANSACTION_FIELDS + SIGNATURE_FIELDS}
+        columns['accessList'] = [
+            [_to_str(item) for item in tx['accessList']] if tx.get('accessList') is not None else None
+            for tx in txs
+        ]
+        columns['authorizationList'] = [
+            [{f: _to_str(auth.get(f)) for f in AUTHORIZATION_FIELDS} for auth in tx['authorizationList']]
+            if tx.get('authorizationList') is not None else None
+            for tx in txs
+        ]
+        columns['_snapshot_timestamp'] = [ts] * len(txs)
+        columns['_original_source_file'] = [_pw['tx_path']] * len(txs)
+        columns['_pool_status'] = statuses
+        _pw['tx'].write_batch(pa.RecordBatch.from_pydict(columns, schema=TRANSACTION_SCHEMA))
+    return _pw['tx_path']
+
+def write_record(now, record):
+    with _write_lock:
+        if _closed.is_set():
+            return None
+        if OUTPUT_FORMAT == 'parquet':
+            return write_record_parquet(now, record)
+        return write_record_jsonl(now, record)
+
+def write_record_jsonl(now, record):
+    date = now.strftime('%Y-%m-%d')
+
+    # one file per day and run, so a run killed before ending its zstd frame can't corrupt the next run's data
+    if _fh['date'] != date:
+        if _fh['f'] is not None:
+            _fh['f'].close()
+        _fh['path'] = os.path.join(OUTPUT_DIR, f"{date}-{now.strftime('%H%M%S')}.log.zst")
+        _fh['f'] = _cctx.stream_writer(open(_fh['path'], 'ab', buffering=1 << 20))
+        _fh['date'] = date
+    _fh['f'].write(orjson.dumps(record, default=_encode, option=orjson.OPT_APPEND_NEWLINE))
+    # end the zstd block so every written snapshot can be decompressed right away
+    _fh['f'].flush(zstandard.FLUSH_BLOCK)
+    return _fh['path']
+
+async def sampler(w3, queue):
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
     while True:
-        dump_once()
-        time.sleep(INTERVAL)
\ No newline at end of file
+        await dump_once(w3, queue)
+        # keep a fixed INTERVAL cadence; after an overrun start the next snapshot right away
+        next_tick = max(next_tick + INTERVAL, loop.time())
+        await asyncio.sleep(next_tick - loop.time())
+
+async def writer(queue):
+    while True:
+        now, record = await queue.get()
+        fn = await asyncio.to_thread(write_record, now, record)
+        # log to stdout/stderr so you can see it in nohup.out
+        print(f"[{dt.datetime.utcnow().isoformat()}Z] wrote snapshot to {fn}", flush=True)
+
+async def main():
+    if OUTPUT_FORMAT == 'parquet' and pa is None:
+        raise SystemExit("OUTPUT_FORMAT = 'parquet' requires 'pip install pyarrow'")
+    # stop cleanly on systemd's SIGTERM too, so open files get their zstd frame end / Parquet footer
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+
+    w3 = await AsyncWeb3(AsyncIPCProvider(IPC_PATH, read_buffer_limit=READ_BUFFER_LIMIT))
+    queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    try:
+        await asyncio.gather(sampler(w3, queue), writer(queue))
+    except asyncio.CancelledError:
+        pass  # SIGTERM is the normal way to stop, so exit with status 0
+    finally:
+        close_writers()
+
+if __name__ == '__main__':
+    asyncio.run(main())
\ No newline at end of file
@@ -2,11 +2,23 @@
 import sys
 import os
 import re
+import io
+import mmap
 import sqlite3
-import gzip
-from collections import defaultdict
+import zlib
+from collections import Counter
+from multiprocessing import Pool
+
+try:
+    from isal import igzip as gzip, isal_zlib
+    # truncated or corrupted .gz inputs; caught per file so one bad log doesn't lose the others
+    READ_ERRORS = (OSError, EOFError, zlib.error, isal_zlib.error)
+except ImportError:
+    import gzip
+    READ_ERRORS = (OSError, EOFError, zlib.error)
 
 DEFAULT_YEAR = "2025"
+READ_BUFFER_SIZE = 128 * 1024
 ERROR_MAP = {
     "nonce too low": "invalidation_nonce_low",
     "nonce too high": "invalidation_nonce_high",
@@ -29,6 +41,22 @@ ERROR_MAP = {
     "in-flight transaction limit reached for delegated accounts": "invalidation_tx_limit_reached",
     "authority already reserved": "invalidation_authority_reserved"
 }
+EVENT_METRICS = {
+    "underpriced": "mempool_underpriced",
+    "replaced": "mempool_replaced"
+}
+# The shared "Discarding " prefix is kept outside the alternation so the regex engine can skip ahead to it
+CLASSIFIER_PATTERN = re.compile(
+    r'Discarding (?:(?P<invalid>invalid transaction(?:.*?(?P<err>' + '|'.join(re.escape(k) for k in ERROR_MAP) + r'))?)'
+    r'|(?P<underpriced>freshly underpriced transaction)'
+    r'|(?P<replaced>future transaction replacing pending tx))'
+)
+LOG_PATTERN = re.compile(r'\[(\d{2}-\d{2})\|(\d{2}:\d{2}):\d{2}\.\d{3}\]')
+
+# Byte-level variants used to scan a whole memory-mapped log file at once
+CLASSIFIER_BYTES_PATTERN = re.compile(CLASSIFIER_PATTERN.pattern.encode())
+TIMESTAMP_BYTES_PATTERN = re.compile(LOG_PATTERN.pattern.encode())
+ERROR_MAP_BYTES = {k.encode(): v for k, v in ERROR_MAP.items()}
 
 def setup_database(db_path):
     print(f"INFO: Setting up SQLite database at {db_path}...")
@@ -40,77 +68,114 @@ def setup_database(db_path):
                 metric_category     TEXT,
                 metric_name         TEXT,
                 count               INTEGER,
-                source_file         TEXT,
-                PRIMARY KEY (timestamp, metric_name, source_file)
+                source_file         TEXT
             )
         """)
         conn.commit()
     print("INFO: Database setup complete.")
 
 
-def process_log_file(db_path, log_file_path):
+def scan_log_buffer(buf, year):
+    """
+    Finds classified events across a whole log buffer (e.g. an mmap) in one regex pass,
+    then back-scans each hit to its line's timestamp. Yields (minute_ts_str, metric_name).
     """
-    Processes a Geth log file line-by-line and inserts aggregated metrics
-    into the SQLite database.
+    counted_line_start = -1
+    for event in CLASSIFIER_BYTES_PATTERN.finditer(buf):
+        line_start = buf.rfind(b'\n', 0, event.start()) + 1
+        if line_start == counted_line_start:
+            continue
+        # the event only counts if the line's timestamp comes before it
+        match = TIMESTAMP_BYTES_PATTERN.search(buf, line_start, event.start())
+        if not match:
+            continue
+        counted_line_start = line_start
+
+        minute_ts_str = f"{year}-{match.group(1).decode()} {match.group(2).decode()}"
+        if event.lastgroup == "invalid":
+            metric_name = ERROR_MAP_BYTES.get(event.group("err"), "invalidation_other")
+        else:
+            metric_name = EVENT_METRICS[event.lastgroup]
+        yield minute_ts_str, metric_name
+
+
+def process_log_file(log_file_path):
+    """
+    Processes a Geth log file (memory-mapped, or line-by-line when gzipped) and
+    returns its aggregated metrics as rows ready for insertion into the geth_metrics table.
     """
     print(f"INFO: Processing file: {log_file_path}")
     
-    counts = defaultdict(lambda: defaultdict(int))
+    counts = Counter()
     
     year_match = re.search(r'(\d{4})-\d{2}-\d{2}', log_file_path)
     year = year_match.group(1) if year_match else DEFAULT_YEAR
 
-    log_pattern = re.compile(r'\[(\d{2}-\d{2})\|(\d{2}:\d{2}):\d{2}\.\d{3}\]\s*(.*)')
-
-    open_func = gzip.open if log_file_path.endswith('.gz') else open
-    
-    with open_func(log_file_path, 'rt', encoding='utf-8', errors='ignore') as f:
-        for line in f:
-            match = log_pattern.search(line)
-            if not match:
-                continue
-
-            minute_ts_str = f"{year}-{match.group(1).replace('-', '-')} {match.group(2)}"
-            log_content = match.group(3).strip()
-
-            # Categorize and Count Events
-            if "Discarding invalid transaction" in log_content:
-                metric_found = False
-                for err_string, metric_name in ERROR_MAP.items():
-                    if err_string in log_content:
-                        counts[minute_ts_str][metric_name] += 1
-                        metric_found = True
-                        break
-                if not metric_found:
-                    counts[minute_ts_str]["invalidation_other"] += 1
-            
-            elif "Discarding freshly underpriced transaction" in log_content:
-                counts[minute_ts_str]["mempool_underpriced"] += 1
-            
-            elif "Discarding future transaction replacing pending tx" in log_content:
-                counts[minute_ts_str]["mempool_replaced"] += 1
+    try:
+        if log_file_path.endswith('.gz'):
+            raw = io.BufferedReader(gzip.open(log_file_path, 'rb'), buffer_size=READ_BUFFER_SIZE)
+            with io.TextIOWrapper(raw, encoding='utf-8', errors='ignore') as f:
+                for line in f:
+                    match = LOG_PATTERN.search(line)
+                    if not match:
+                        continue
+
+                    # Categorize and Count Events (searching the message in place, after the timestamp)
+                    event = CLASSIFIER_PATTERN.search(line, match.end())
+                    if not event:
+                        continue
+                    minute_ts_str = f"{year}-{match.group(1)} {match.group(2)}"
+                    if event.lastgroup == "invalid":
+                        metric_name = ERROR_MAP.get(event.group("err"), "invalidation_other")
+                    else:
+                        metric_name = EVENT_METRICS[event.lastgroup]
+                    counts[minute_ts_str, metric_name] += 1
+        else:
+            # Uncompressed logs are scanned in place, without splitting into lines
+            if os.path.getsize(log_file_path) > 0:
+                with open(log_file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    counts.update(scan_log_buffer(mm, year))
+    except READ_ERRORS as e:
+        # e.g. a truncated .gz still being written; the other files are still loaded
+        print(f"ERROR: Failed to read {log_file_path}. Error: {e}")
+        return []
 
     if not counts:
         print(f"INFO: No relevant metrics found in {log_file_path}.")
-        return
+        return []
 
-    records_to_insert = []
     source_filename = os.path.basename(log_file_path)
-    for ts, metric_dict in counts.items():
-        for metric, count in metric_dict.items():
-            category = metric.split('_')[0]
-            records_to_insert.append((ts, category, metric, count, source_filename))
+    records_to_insert = [
+        (ts, metric.split('_', 1)[0], metric, count, source_filename)
+        for (ts, metric), count in counts.items()
+    ]
     
+    print(f"INFO: Finished processing: {log_file_path} ({len(records_to_insert)} aggregated metric records)")
+    return records_to_insert
+
+
+def insert_records(db_path, records):
+    """
+    Bulk-inserts the aggregated metrics of all files in a single transaction,
+    then adds the (timestamp, metric_name, source_file) key once the data is loaded.
+    """
+    print(f"\nINFO: Inserting {len(records)} aggregated metric records...")
+    conn = sqlite3.connect(db_path, isolation_level=None)
     try:
-        with sqlite3.connect(db_path) as conn:
-            cursor = conn.cursor()
-            cursor.executemany("INSERT OR IGNORE INTO geth_metrics VALUES (?, ?, ?, ?, ?)", records_to_insert)
-            conn.commit()
-            print(f"INFO: Inserted/ignored {len(records_to_insert)} aggregated metric records for {source_filename}.")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("BEGIN")
+        conn.executemany("INSERT OR IGNORE INTO geth_metrics VALUES (?, ?, ?, ?, ?)", records)
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_geth_metrics_key ON geth_metrics (timestamp, metric_name, source_file)")
+        conn.execute("COMMIT")
+        print("INFO: Insert complete.")
     except sqlite3.Error as e:
-        print(f"ERROR: Failed to insert data for {log_file_path}. Error: {e}")
-        
-    print(f"INFO: Finished processing: {log_file_path}")
+        if conn.in_transaction:
+            conn.rollback()
+        print(f"ERROR: Failed to insert aggregated metrics. Error: {e}")
+    finally:
+        conn.close()
 
 
 def create_final_summary_and_indexes(db_path):
@@ -157,13 +222,19 @@ if __name__ == "__main__":
     setup_database(db_file_path)
 
     # Find and process all relevant log files starting with 'geth'
-    log_files = [os.path.join(log_dir, f) for f in sorted(os.listdir(log_dir)) if f.startswith('geth')] 
+    with os.scandir(log_dir) as it:
+        log_files = [e.path for e in sorted((e for e in it if e.name.startswith('geth')), key=lambda e: e.name)]
     
     print(f"INFO: Found {len(log_files)} log files to process.")
     
-    for file_path in log_files:
-        process_log_file(db_file_path, file_path)
-        
+    # Files are independent, so parse them in parallel and only merge the aggregated rows
+    all_records = []
+    with Pool(max(1, min(os.cpu_count() or 1, len(log_files)))) as pool:
+        for records in pool.imap_unordered(process_log_file, log_files, chunksize=1):
+            all_records.extend(records)
+
+    insert_records(db_file_path, all_records)
+
     create_final_summary_and_indexes(db_file_path)
     
     print("\n--- Processing Complete! ---")
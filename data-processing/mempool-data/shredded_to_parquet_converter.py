@@ -1,12 +1,17 @@
 import json
+import os
 import sys
+from pyspark import StorageLevel
 from pyspark.sql import SparkSession
-from pyspark.sql.functions import udf, col, explode, posexplode, lit, to_date, input_file_name, expr, when
+from pyspark.sql.functions import col, explode, posexplode, lit, to_date, input_file_name, expr, when, conv, substring, broadcast, octet_length
 from pyspark.sql.types import (
     StructType, StructField, StringType, LongType, BooleanType,
-    ArrayType, TimestampType, DateType, IntegerType 
+    ArrayType, TimestampType, IntegerType 
 )
 
+# Set to True to print schemas, samples and intermediate counts (each one triggers an extra Spark job)
+DEBUG = False
+
 # Define schemas for pre-processed data
 
 # Schema for an individual authorization tuple (object/dictionary)
@@ -57,60 +62,97 @@ SHREDDED_SNAPSHOT_SUMMARY_SCHEMA = StructType([
     StructField("original_source_file", StringType(), True)
 ])
 
-# Helper  functions for hex conversion
-def parse_hex_to_long(hex_str):
-    if hex_str and isinstance(hex_str, str) and hex_str.startswith('0x'):
-        try: return int(hex_str, 16)
-        except ValueError: return None
-    return None
-parse_hex_to_long_udf = udf(parse_hex_to_long, LongType())
+# Hex conversion backend: "conv" uses native Spark expressions, "pandas" uses
+# vectorized pandas UDFs over Arrow batches (needs pandas + pyarrow on the executors)
+HEX_CONVERSION = "conv"
+
+_hex_udfs = {}
+
+def _hex_pandas_udf(spark_type):
+    """Build (once per type) a pandas UDF that decodes whole Arrow batches with arrow_hex_to_int."""
+    if spark_type not in _hex_udfs:
+        import pandas as pd
+        import pyarrow as pa
+        from pyspark.sql.functions import pandas_udf
+
+        arrow_type, pandas_type = (pa.int64(), pd.Int64Dtype()) if spark_type == LongType() else (pa.int32(), pd.Int32Dtype())
+
+        @pandas_udf(spark_type)
+        def hex_to_int(s: pd.Series) -> pd.Series:
+            values = arrow_hex_to_int(pa.array(s, type=pa.string(), from_pandas=True), arrow_type)
+            return values.to_pandas(types_mapper={arrow_type: pandas_type}.get)
+
+        _hex_udfs[spark_type] = hex_to_int
+    return _hex_udfs[spark_type]
+
+# Helper functions for hex conversion
+def parse_hex_to_long(hex_col):
+    if HEX_CONVERSION == "pandas":
+        return _hex_pandas_udf(LongType())(hex_col)
+    return when(hex_col.startswith("0x"),
+                conv(substring(hex_col, 3, 64), 16, 10).cast(LongType())
+    ).otherwise(lit(None))
 
-def parse_hex_to_int(hex_str):
-    if hex_str and isinstance(hex_str, str) and hex_str.startswith('0x'):
-        try: return int(hex_str, 16)
-        except ValueError: return None
-    return None
-parse_hex_to_int_udf = udf(parse_hex_to_int, IntegerType())
+def parse_hex_to_int(hex_col):
+    if HEX_CONVERSION == "pandas":
+        return _hex_pandas_udf(IntegerType())(hex_col)
+    return when(hex_col.startswith("0x"),
+                conv(substring(hex_col, 3, 64), 16, 10).cast(IntegerType())
+    ).otherwise(lit(None))
 
 
 # Main processing loop
-def main(shredded_transactions_input_path, shredded_snapshots_input_path, output_base_path):
+def read_shredded(spark, input_path, schema, input_format):
+    reader = spark.read.schema(schema)
+    return reader.parquet(input_path) if input_format == "parquet" else reader.json(input_path)
+
+
+def main(shredded_transactions_input_path, shredded_snapshots_input_path, output_base_path, input_format="json"):
     spark = SparkSession.builder \
         .appName("ShreddedJsonToParquetConverter_AuthFix") \
         .config("spark.sql.legacy.json.allowEmptyString.enabled", "true") \
-        .config("spark.sql.caseSensitive", "false").getOrCreate()
+        .config("spark.sql.caseSensitive", "false") \
+        .config("spark.sql.autoBroadcastJoinThreshold", "64MB").getOrCreate()
 
-    print(f"DEBUG: Reading shredded transaction logs from: {shredded_transactions_input_path}")
-    transactions_df = spark.read.schema(SHREDDED_TRANSACTION_SCHEMA).json(shredded_transactions_input_path)
+    print(f"DEBUG: Reading shredded transaction {input_format} from: {shredded_transactions_input_path}")
+    transactions_df = read_shredded(spark, shredded_transactions_input_path, SHREDDED_TRANSACTION_SCHEMA, input_format)
     
-    print("DEBUG: Schema of transactions_df (directly after reading shredded JSON):")
-    transactions_df.printSchema(level=3) 
-    print("DEBUG: Showing Type 4 transactions from transactions_df BEFORE further processing (up to 5):")
-    transactions_df.filter(col("type") == "0x4").select("hash", "type", "authorizationList").show(5, truncate=False)
+    if DEBUG:
+        print("DEBUG: Schema of transactions_df (directly after reading shredded JSON):")
+        transactions_df.printSchema(level=3) 
+        print("DEBUG: Showing Type 4 transactions from transactions_df BEFORE further processing (up to 5):")
+        transactions_df.filter(col("type") == "0x4").select("hash", "type", "authorizationList").show(5, truncate=False)
+
+    # Decode the type once up front; the authorization and type-4 count branches only need
+    # a handful of columns from the (few) type-4 rows, so they filter before projecting anything else
+    typed_df = transactions_df.withColumn("tx_type", parse_hex_to_int(col("type")))
+    # Shared by the authorizations, type-4 counts and transactions outputs
+    typed_df.persist(StorageLevel.MEMORY_AND_DISK)
+    type4_df = typed_df.filter(col("tx_type") == 4) \
+        .select("hash", "_snapshot_timestamp", "authorizationList") \
+        .withColumn("snapshot_timestamp", col("_snapshot_timestamp").cast(TimestampType()))
 
     # Process Individual Transactions
     print("DEBUG: Processing individual transaction details from shredded data...")
-    processed_transactions_df = transactions_df.select(
+    processed_transactions_df = typed_df.select(
         col("hash").alias("tx_hash"), 
         col("_snapshot_timestamp").cast(TimestampType()).alias("snapshot_timestamp"),
         col("type").alias("tx_type_hex"), 
         col("from").alias("from_address"),
         col("to").alias("to_address"),
-        parse_hex_to_long_udf(col("gas")).alias("gas_limit"),
-        parse_hex_to_long_udf(col("gasPrice")).alias("gas_price"), 
-        parse_hex_to_long_udf(col("maxFeePerGas")).alias("max_fee_per_gas"),
-        parse_hex_to_long_udf(col("maxPriorityFeePerGas")).alias("max_priority_fee_per_gas"),
+        parse_hex_to_long(col("gas")).alias("gas_limit"),
+        parse_hex_to_long(col("gasPrice")).alias("gas_price"), 
+        parse_hex_to_long(col("maxFeePerGas")).alias("max_fee_per_gas"),
+        parse_hex_to_long(col("maxPriorityFeePerGas")).alias("max_priority_fee_per_gas"),
         col("value").alias("value_hex"),
-        parse_hex_to_long_udf(col("nonce")).alias("nonce"),
+        parse_hex_to_long(col("nonce")).alias("nonce"),
         col("input").alias("input_data"),
         col("authorizationList").alias("raw_authorization_list"),
         col("_pool_status").alias("pool_status"),
-        col("_original_source_file").alias("original_source_file") 
+        col("_original_source_file").alias("original_source_file"),
+        col("tx_type")
     ).withColumn("snapshot_date", to_date(col("snapshot_timestamp")))
 
-    processed_transactions_df = processed_transactions_df.withColumn(
-        "tx_type", parse_hex_to_int_udf(col("tx_type_hex"))
-    )
     processed_transactions_df = processed_transactions_df.withColumn(
         "is_eip7702", col("tx_type") == 4
     )
@@ -123,54 +165,44 @@ def main(shredded_transactions_input_path, shredded_snapshots_input_path, output
     processed_transactions_df = processed_transactions_df.withColumn(
         "input_data_size_bytes",
         when(col("input_data").isNotNull() & (col("input_data") != "0x"),
-             (expr("length(substring(input_data, 3))") / 2).cast(IntegerType())
+             ((octet_length(col("input_data")) - 2) / 2).cast(IntegerType())
         ).otherwise(0)
     )
-    
-    print("DEBUG: Sample of Type 4 transactions from processed_transactions_df (showing raw_authorization_list and count):")
-    type4_tx_sample_df = processed_transactions_df.filter(col("is_eip7702") == True)
-    type4_tx_sample_df.select("tx_hash", "tx_type_hex", "raw_authorization_list", "authorization_count").show(20, truncate=False)
-    print(f"DEBUG: Count of Type 4 transactions found in processed_transactions_df: {type4_tx_sample_df.count()}")
 
-    processed_tx_count = processed_transactions_df.count()
-    print(f"DEBUG: Final count of processed transactions: {processed_tx_count}")
+    if DEBUG:
+        print("DEBUG: Sample of Type 4 transactions from processed_transactions_df (showing raw_authorization_list and count):")
+        type4_tx_sample_df = processed_transactions_df.filter(col("is_eip7702") == True)
+        type4_tx_sample_df.select("tx_hash", "tx_type_hex", "raw_authorization_list", "authorization_count").show(20, truncate=False)
+        print(f"DEBUG: Count of Type 4 transactions found in processed_transactions_df: {type4_tx_sample_df.count()}")
+
+        processed_tx_count = processed_transactions_df.count()
+        print(f"DEBUG: Final count of processed transactions: {processed_tx_count}")
 
     # Create Authorizations DataFrame
     print("Processing EIP-7702 authorizations...")
-    eip7702_txs_with_auths_df = processed_transactions_df.filter(
-        col("is_eip7702") & (col("authorization_count") > 0)
+    # Explode the array of authorization structs (posexplode drops null and empty lists)
+    # (an empty input simply yields an empty frame, which write_df_to_parquet skips)
+    authorizations_df_exploded = type4_df.select(
+        col("hash").alias("tx_hash"), col("snapshot_timestamp"),
+        to_date(col("snapshot_timestamp")).alias("snapshot_date"),
+        posexplode(col("authorizationList")).alias("auth_index", "auth_struct")
     )
     
-    authorizations_df = None 
-    if not eip7702_txs_with_auths_df.rdd.isEmpty():
-        # Explode the array of authorization structs
-        authorizations_df_exploded = eip7702_txs_with_auths_df.select(
-            col("tx_hash"), col("snapshot_timestamp"), col("snapshot_date"),
-            posexplode(col("raw_authorization_list")).alias("auth_index", "auth_struct") 
-        )
-        
-        # Select fields from the exploded authorization struct
-        authorizations_df = authorizations_df_exploded.select(
-            "tx_hash", "snapshot_timestamp", "snapshot_date", "auth_index",
-            parse_hex_to_long_udf(col("auth_struct.chainId")).alias("auth_chain_id"),
-            col("auth_struct.address").alias("auth_address_delegating_to"),
-            parse_hex_to_long_udf(col("auth_struct.nonce")).alias("auth_nonce")
-        )
+    # Select fields from the exploded authorization struct
+    authorizations_df = authorizations_df_exploded.select(
+        "tx_hash", "snapshot_timestamp", "snapshot_date", "auth_index",
+        parse_hex_to_long(col("auth_struct.chainId")).alias("auth_chain_id"),
+        col("auth_struct.address").alias("auth_address_delegating_to"),
+        parse_hex_to_long(col("auth_struct.nonce")).alias("auth_nonce")
+    )
+    authorizations_df.persist(StorageLevel.MEMORY_AND_DISK)
+    if DEBUG:
         auth_count = authorizations_df.count()
         print(f"DEBUG: Extracted {auth_count} authorization entries.")
-    else:
-        print("DEBUG: No EIP-7702 transactions with authorization_count > 0 found to populate authorizations_df.")
-        auth_schema = StructType([
-            StructField("tx_hash", StringType(), True), StructField("snapshot_timestamp", TimestampType(), True),
-            StructField("snapshot_date", DateType(), True), StructField("auth_index", IntegerType(), True),
-            StructField("auth_chain_id", LongType(), True), StructField("auth_address_delegating_to", StringType(), True),
-            StructField("auth_nonce", LongType(), True)
-        ])
-        authorizations_df = spark.createDataFrame([], schema=auth_schema)
 
     # Process Snapshot Summaries and add type4_tx_count
     print(f"DEBUG: Reading shredded snapshot summary logs from: {shredded_snapshots_input_path}")
-    snapshot_summary_input_df = spark.read.schema(SHREDDED_SNAPSHOT_SUMMARY_SCHEMA).json(shredded_snapshots_input_path)
+    snapshot_summary_input_df = read_shredded(spark, shredded_snapshots_input_path, SHREDDED_SNAPSHOT_SUMMARY_SCHEMA, input_format)
     
     snapshot_summary_df = snapshot_summary_input_df.select(
         col("snapshot_timestamp").cast(TimestampType()).alias("snapshot_timestamp_ts"),
@@ -181,15 +213,15 @@ def main(shredded_transactions_input_path, shredded_snapshots_input_path, output
      .withColumnRenamed("snapshot_timestamp_ts", "snapshot_timestamp")
 
     print("Calculating Type 4 transaction counts for snapshots from processed transactions...")
-    type4_counts_per_snapshot = processed_transactions_df \
-        .filter(col("is_eip7702")) \
+    type4_counts_per_snapshot = type4_df \
         .groupBy("snapshot_timestamp") \
         .count() \
         .withColumnRenamed("count", "type4_tx_count_agg") \
         .withColumnRenamed("snapshot_timestamp", "ts_for_join")
 
+    # One row per snapshot timestamp, small enough to ship to every executor
     snapshot_summary_final_df = snapshot_summary_df.join(
-        type4_counts_per_snapshot,
+        broadcast(type4_counts_per_snapshot),
         snapshot_summary_df.snapshot_timestamp == type4_counts_per_snapshot.ts_for_join,
         "left_outer"
     ).select(
@@ -200,6 +232,7 @@ def main(shredded_transactions_input_path, shredded_snapshots_input_path, output
         snapshot_summary_df["original_source_file"],
         snapshot_summary_df["snapshot_date"]
     ).fillna(0, subset=["type4_tx_count"])
+    snapshot_summary_final_df.persist(StorageLevel.MEMORY_AND_DISK)
 
     # Write Transformed Data as Partitioned Parquet
     snapshots_output_path = f"{output_base_path.rstrip('/')}/snapshots"
@@ -220,9 +253,10 @@ def main(shredded_transactions_input_path, shredded_snapshots_input_path, output
 
     def write_df_to_parquet(df_to_write, path, df_name, partition_col="snapshot_date"):
         print(f"\n--- Preparing to write: {df_name} to {path} ---")
-        df_to_write.printSchema()
-        print(f"Sample data for {df_name} (up to 2 rows):")
-        df_to_write.show(2, truncate=False)
+        if DEBUG:
+            df_to_write.printSchema()
+            print(f"Sample data for {df_name} (up to 2 rows):")
+            df_to_write.show(2, truncate=False)
         
         count = df_to_write.count()
         
@@ -244,16 +278,223 @@ def main(shredded_transactions_input_path, shredded_snapshots_input_path, output
     write_df_to_parquet(final_transactions_df_to_write, transactions_output_path, "Transactions")
     write_df_to_parquet(authorizations_df, authorizations_output_path, "Authorizations")
 
+    for cached_df in (snapshot_summary_final_df, authorizations_df, typed_df):
+        cached_df.unpersist()
+
     print("Processing complete.")
     spark.stop()
 
+# Local (single machine) processing with PyArrow, for daily volumes that don't need a Spark cluster.
+# Produces the same three partitioned Parquet datasets as main(); expects hex fields encoded as "0x..." strings.
+def spark_schema_to_arrow(spark_type):
+    import pyarrow as pa
+    if isinstance(spark_type, StructType):
+        return pa.struct([pa.field(f.name, spark_schema_to_arrow(f.dataType), f.nullable) for f in spark_type.fields])
+    if isinstance(spark_type, ArrayType):
+        return pa.list_(spark_schema_to_arrow(spark_type.elementType))
+    if isinstance(spark_type, LongType):
+        return pa.int64()
+    return pa.string()
+
+
+def arrow_hex_to_int(hex_array, arrow_type):
+    """
+    Vectorized "0x..." -> integer conversion. Nulls out values that are not
+    hex or do not fit arrow_type, like the casts in parse_hex_to_long/int.
+    """
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    hex_array = pc.cast(hex_array, pa.string())
+    if isinstance(hex_array, pa.ChunkedArray):
+        hex_array = hex_array.combine_chunks()
+    valid = pc.fill_null(pc.match_substring_regex(hex_array, r"^0x[0-9a-fA-F]{1,16}$"), False)
+    digits = pc.utf8_lpad(pc.utf8_slice_codeunits(pc.if_else(valid, hex_array, "0x0"), 2), 16, "0")
+
+    # Fixed-width 16-digit strings: decode every nibble with a 256-entry lookup table
+    lut = np.zeros(256, dtype=np.uint64)
+    for i, c in enumerate(b"0123456789abcdef"):
+        lut[c] = i
+    for i, c in enumerate(b"ABCDEF"):
+        lut[c] = 10 + i
+    offsets = np.frombuffer(digits.buffers()[1], dtype=np.int32)[digits.offset:digits.offset + len(digits) + 1]
+    data = np.frombuffer(digits.buffers()[2], dtype=np.uint8)[offsets[0]:offsets[-1]]
+    nibbles = lut[data].reshape(-1, 16)
+    values = (nibbles << np.arange(60, -1, -4, dtype=np.uint64)).sum(axis=1, dtype=np.uint64)
+
+    limit = np.iinfo(arrow_type.to_pandas_dtype()).max
+    valid = valid.to_numpy(zero_copy_only=False) & (values <= limit)
+    return pa.array(np.where(valid, values, 0).astype(arrow_type.to_pandas_dtype()), type=arrow_type, mask=~valid)
+
+
+def arrow_to_timestamp(strings, timestamp_type):
+    """
+    Casts timestamp strings to timestamp_type, nulling out values that don't
+    parse, like Spark's cast(TimestampType()).
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    try:
+        return pc.cast(strings, timestamp_type)
+    except pa.ArrowInvalid:
+        pass
+    # Some value is unparseable: cast the distinct values one by one and map them back
+    distinct = pc.unique(strings)
+    parsed = []
+    for value in distinct:
+        try:
+            parsed.append(pc.cast(value, timestamp_type).as_py())
+        except pa.ArrowInvalid:
+            parsed.append(None)
+    return pc.take(pa.array(parsed, type=timestamp_type), pc.index_in(strings, value_set=distinct))
+
+
+def read_shredded_local(input_path, spark_schema, input_format):
+    import pyarrow as pa
+    import pyarrow.json as paj
+    import pyarrow.parquet as pq
+
+    # accessList is not used locally, and its JSON objects don't fit the string list Spark reads them as;
+    # left out of the schema, it is skipped by unexpected_field_behavior="ignore"
+    arrow_schema = pa.schema([
+        pa.field(f.name, spark_schema_to_arrow(f.dataType))
+        for f in spark_schema.fields if f.name != "accessList"
+    ])
+    if input_format == "parquet":
+        return pq.read_table(input_path, schema=arrow_schema, partitioning=None)
+
+    if os.path.isdir(input_path):
+        files = sorted(
+            os.path.join(root, name)
+            for root, _dirs, names in os.walk(input_path)
+            for name in names if not name.startswith(('.', '_'))
+        )
+    else:
+        files = [input_path]
+
+    parse_options = paj.ParseOptions(explicit_schema=arrow_schema, unexpected_field_behavior="ignore")
+    tables = [paj.read_json(f, parse_options=parse_options) for f in files]
+    return pa.concat_tables(tables) if tables else arrow_schema.empty_table()
+
+
+def main_local(shredded_transactions_input_path, shredded_snapshots_input_path, output_base_path, input_format="json"):
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    timestamp_type = pa.timestamp("us", tz="UTC")
+
+    print(f"Reading shredded transaction logs from: {shredded_transactions_input_path}")
+    tx = read_shredded_local(shredded_transactions_input_path, SHREDDED_TRANSACTION_SCHEMA, input_format)
+
+    snapshot_timestamp = arrow_to_timestamp(tx["_snapshot_timestamp"], timestamp_type)
+    tx_type = arrow_hex_to_int(tx["type"], pa.int32())
+    is_eip7702 = pc.equal(tx_type, 4)
+    authorization_list = tx["authorizationList"]
+    input_data = tx["input"]
+    has_input = pc.fill_null(pc.and_(pc.is_valid(input_data), pc.not_equal(input_data, "0x")), False)
+    input_size = pc.max_element_wise(pc.divide(pc.subtract(pc.binary_length(input_data), 2), 2), 0)
+
+    transactions = pa.table({
+        "tx_hash": tx["hash"],
+        "snapshot_timestamp": snapshot_timestamp,
+        "tx_type_hex": tx["type"],
+        "tx_type": tx_type,
+        "from_address": tx["from"],
+        "to_address": tx["to"],
+        "gas_limit": arrow_hex_to_int(tx["gas"], pa.int64()),
+        "gas_price": arrow_hex_to_int(tx["gasPrice"], pa.int64()),
+        "max_fee_per_gas": arrow_hex_to_int(tx["maxFeePerGas"], pa.int64()),
+        "max_priority_fee_per_gas": arrow_hex_to_int(tx["maxPriorityFeePerGas"], pa.int64()),
+        "value_hex": tx["value"],
+        "nonce": arrow_hex_to_int(tx["nonce"], pa.int64()),
+        "input_data_size_bytes": pc.cast(pc.if_else(has_input, input_size, 0), pa.int32()),
+        "is_eip7702": is_eip7702,
+        "raw_authorization_list": authorization_list,
+        "authorization_count": pc.cast(pc.if_else(
+            pc.fill_null(pc.and_(is_eip7702, pc.is_valid(authorization_list)), False),
+            pc.list_value_length(authorization_list), 0), pa.int32()),
+        "snapshot_date": pc.cast(snapshot_timestamp, pa.date32()),
+        "original_source_file": tx["_original_source_file"],
+        "pool_status": tx["_pool_status"],
+    })
+
+    # Explode the authorization lists of type-4 transactions (posexplode equivalent)
+    print("Processing EIP-7702 authorizations...")
+    with_auths = transactions.filter(pc.fill_null(
+        pc.and_(transactions["is_eip7702"], pc.greater(transactions["authorization_count"], 0)), False))
+    auth_lists = with_auths["raw_authorization_list"].combine_chunks()
+    auth_structs = pc.list_flatten(auth_lists)
+    parents = pc.list_parent_indices(auth_lists).to_numpy()
+    list_starts = np.concatenate(([0], np.cumsum(pc.list_value_length(auth_lists).to_numpy())[:-1]))
+    authorizations = pa.table({
+        "tx_hash": with_auths["tx_hash"].take(parents),
+        "snapshot_timestamp": with_auths["snapshot_timestamp"].take(parents),
+        "snapshot_date": with_auths["snapshot_date"].take(parents),
+        "auth_index": pa.array(np.arange(len(parents)) - list_starts[parents], type=pa.int32()),
+        "auth_chain_id": arrow_hex_to_int(pc.struct_field(auth_structs, "chainId"), pa.int64()),
+        "auth_address_delegating_to": pc.struct_field(auth_structs, "address"),
+        "auth_nonce": arrow_hex_to_int(pc.struct_field(auth_structs, "nonce"), pa.int64()),
+    })
+
+    print(f"Reading shredded snapshot summary logs from: {shredded_snapshots_input_path}")
+    sn = read_shredded_local(shredded_snapshots_input_path, SHREDDED_SNAPSHOT_SUMMARY_SCHEMA, input_format)
+    snapshot_ts = arrow_to_timestamp(sn["snapshot_timestamp"], timestamp_type)
+    snapshots = pa.table({
+        "snapshot_timestamp": snapshot_ts,
+        "pending_count": sn["pending_count"],
+        "queued_count": sn["queued_count"],
+        "original_source_file": sn["original_source_file"],
+        "snapshot_date": pc.cast(snapshot_ts, pa.date32()),
+    })
+
+    print("Calculating Type 4 transaction counts for snapshots from processed transactions...")
+    type4_counts = transactions.filter(pc.fill_null(transactions["is_eip7702"], False)) \
+        .group_by("snapshot_timestamp").aggregate([([], "count_all")]) \
+        .rename_columns(["snapshot_timestamp", "type4_tx_count"])
+    snapshots = snapshots.join(type4_counts, "snapshot_timestamp", join_type="left outer")
+    snapshots = snapshots.set_column(
+        snapshots.schema.get_field_index("type4_tx_count"), "type4_tx_count",
+        pc.fill_null(snapshots["type4_tx_count"], 0)
+    ).select(["snapshot_timestamp", "pending_count", "queued_count",
+              "type4_tx_count", "original_source_file", "snapshot_date"])
+
+    def write_table_to_parquet(table, path, table_name, partition_col="snapshot_date"):
+        print(f"\n--- Preparing to write: {table_name} to {path} ---")
+        if table.num_rows > 0:
+            print(f"Attempting to write {table.num_rows} records for {table_name} to {path} partitioned by {partition_col}")
+            pq.write_to_dataset(table, root_path=path, partition_cols=[partition_col],
+                                compression="snappy", existing_data_behavior="delete_matching")
+            print(f"SUCCESS: Wrote {table_name} to {path}")
+        else:
+            print(f"Table for {table_name} ({path}) is empty. Skipping write.")
+
+    write_table_to_parquet(snapshots, f"{output_base_path.rstrip('/')}/snapshots", "Snapshots")
+    write_table_to_parquet(transactions, f"{output_base_path.rstrip('/')}/transactions", "Transactions")
+    write_table_to_parquet(authorizations, f"{output_base_path.rstrip('/')}/authorizations", "Authorizations")
+
+    print("Processing complete.")
+
+
 if __name__ == "__main__":
-    if len(sys.argv) != 4: 
-        print("Usage: spark-submit your_script_name.py <shredded_transactions_input_path> <shredded_snapshots_input_path> <output_base_directory_path>")
+    flags = {"--local", "--parquet-input"}
+    local_mode = "--local" in sys.argv[1:]
+    input_format = "parquet" if "--parquet-input" in sys.argv[1:] else "json"
+    args = [a for a in sys.argv[1:] if a not in flags]
+    if len(args) != 3: 
+        print("Usage: spark-submit your_script_name.py [--parquet-input] <shredded_transactions_input_path> <shredded_snapshots_input_path> <output_base_directory_path>")
+        print("   or: python3 your_script_name.py --local [--parquet-input] <shredded_transactions_input_path> <shredded_snapshots_input_path> <output_base_directory_path>")
+        print("--parquet-input reads the Parquet written by mempool_dump.py (OUTPUT_FORMAT = 'parquet') instead of shredded JSON.")
         sys.exit(-1)
 
-    shredded_tx_input_path_arg = sys.argv[1].strip()
-    shredded_sn_input_path_arg = sys.argv[2].strip()
-    output_base_path_arg = sys.argv[3].strip()
+    shredded_tx_input_path_arg = args[0].strip()
+    shredded_sn_input_path_arg = args[1].strip()
+    output_base_path_arg = args[2].strip()
     
-    main(shredded_tx_input_path_arg, shredded_sn_input_path_arg, output_base_path_arg)
\ No newline at end of file
+    if local_mode:
+        main_local(shredded_tx_input_path_arg, shredded_sn_input_path_arg, output_base_path_arg, input_format)
+    else:
+        main(shredded_tx_input_path_arg, shredded_sn_input_path_arg, output_base_path_arg, input_format)
\ No newline at end of file
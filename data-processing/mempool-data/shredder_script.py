@@ -1,34 +1,416 @@
-import json
-import gzip
+import contextlib
+import io
+import itertools
 import os
+import re
 import sys
-from datetime import datetime
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Union
+
+import msgspec
+import orjson
+
+try:
+    from isal import igzip as gzip, igzip_threaded
+except ImportError:
+    import gzip
+    igzip_threaded = None
+
+try:
+    import indexed_gzip
+except ImportError:
+    indexed_gzip = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# mempool_dump.py names its files YYYY-MM-DD[-HHMMSS].log(.zst); the date becomes the output partition
+DATE_RE = re.compile(r'(\d{4}-\d{2}-\d{2})')
+UNSAFE_FILENAME_CHARS_RE = re.compile(r'[^\w-]')
+
+# Input read size; larger reads mean fewer read calls and bigger chunks fed to the decompressor
+READ_BUFFER_SIZE = 128 * 1024
+
+# Input lines are shredded on worker processes in batches of about this many bytes
+SHRED_BATCH_BYTES = 16 * 1024 * 1024
+SHRED_WORKERS = os.cpu_count() or 1
+# Distance between seek points in the index built for .gz inputs when indexed_gzip is installed;
+# each worker then shreds the lines between two neighbouring seek points
+GZIP_INDEX_SPACING = 32 * 1024 * 1024
+
+# Background threads compressing each gzip output when isal is installed
+OUTPUT_GZIP_THREADS = 2
+# The shredded files are intermediate, so favour speed over size
+OUTPUT_GZIP_LEVEL = 1
+
+# Parquet output (--parquet) uses the same string-typed layout as mempool_dump.py's Parquet mode,
+# so shredded_to_parquet_converter.py reads either with --parquet-input. mempool_dump.py holds the
+# reference copy of the layout; the fields, schemas and writer settings below are identical to it.
+# Only the transaction row groups differ: they follow the worker batches, not one per snapshot
+TRANSACTION_FIELDS = [
+    'blockHash', 'blockNumber', 'from', 'gas', 'gasPrice', 'maxFeePerGas', 'maxPriorityFeePerGas',
+    'hash', 'input', 'nonce', 'to', 'transactionIndex', 'value', 'type'
+]
+SIGNATURE_FIELDS = ['chainId', 'v', 'r', 's', 'yParity']
+AUTHORIZATION_FIELDS = ['chainId', 'address', 'nonce', 'yParity', 'r', 's']
+PARQUET_DICTIONARY_COLUMNS = [
+    '_pool_status', '_original_source_file', '_snapshot_timestamp', 'type', 'chainId',
+    'snapshot_timestamp', 'original_source_file'
+]
+SNAPSHOT_ROWS_PER_GROUP = 360
+SNAPSHOT_COLUMN_ENCODING = {'pending_count': 'DELTA_BINARY_PACKED', 'queued_count': 'DELTA_BINARY_PACKED'}
+
+if pa is not None:
+    PARQUET_SCHEMAS = {
+        'transactions': pa.schema(
+            [(f, pa.string()) for f in TRANSACTION_FIELDS]
+            + [('accessList', pa.list_(pa.string()))]
+            + [(f, pa.string()) for f in SIGNATURE_FIELDS]
+            + [('authorizationList', pa.list_(pa.struct([(f, pa.string()) for f in AUTHORIZATION_FIELDS])))]
+            + [('_snapshot_timestamp', pa.string()), ('_original_source_file', pa.string()), ('_pool_status', pa.string())]
+        ),
+        'snapshots': pa.schema([
+            ('snapshot_timestamp', pa.string()),
+            ('pending_count', pa.int64()),
+            ('queued_count', pa.int64()),
+            ('original_source_file', pa.string())
+        ])
+    }
+
+class Snapshot(msgspec.Struct):
+    """txpool_content: sender -> nonce -> transaction, with each transaction left undecoded."""
+    pending: Optional[Dict[str, Dict[str, msgspec.Raw]]] = None
+    queued: Optional[Dict[str, Dict[str, msgspec.Raw]]] = None
+
+class LogEntry(msgspec.Struct):
+    """One line written by mempool_dump.py, decoded in a single pass down to the raw transactions."""
+    timestamp: Any = None
+    snapshot: Union[Snapshot, str, None] = None
+    pending_count: Any = 0
+    queued_count: Any = 0
+
+class RawLogEntry(msgspec.Struct):
+    """Fallback for lines whose snapshot doesn't fit LogEntry; the snapshot is kept as raw JSON."""
+    timestamp: Any = None
+    snapshot: msgspec.Raw = msgspec.Raw(b'null')
+    pending_count: Any = 0
+    queued_count: Any = 0
+
+OPEN_BRACE = ord('{')
+JSON_WHITESPACE = b' \t\r\n'
+
+LOG_ENTRY_DECODER = msgspec.json.Decoder(LogEntry)
+RAW_LOG_ENTRY_DECODER = msgspec.json.Decoder(RawLogEntry)
+SNAPSHOT_DECODER = msgspec.json.Decoder(Snapshot)
+
+def open_gzip_output(output_file_path):
+    """Opens a gzip file for binary writing, compressing on worker threads if isal is available."""
+    if igzip_threaded is not None:
+        return igzip_threaded.open(output_file_path, 'wb', compresslevel=OUTPUT_GZIP_LEVEL, threads=OUTPUT_GZIP_THREADS)
+    return gzip.open(output_file_path, 'wb', compresslevel=OUTPUT_GZIP_LEVEL)
+
+def open_output(output_file_path, output_format, kind):
+    """Opens the transactions or snapshots sink: a gzipped JSON lines file, or a Parquet writer."""
+    if output_format == 'parquet':
+        return pq.ParquetWriter(output_file_path, PARQUET_SCHEMAS[kind], compression='zstd',
+                                use_dictionary=PARQUET_DICTIONARY_COLUMNS,
+                                column_encoding=SNAPSHOT_COLUMN_ENCODING if kind == 'snapshots' else None)
+    return open_gzip_output(output_file_path)
+
+def to_str(value):
+    # mempool_dump.py's _to_str, minus the web3 types that never reach the shredder
+    if value is None or type(value) is str:
+        return value
+    if type(value) is int:
+        return str(value)
+    return orjson.dumps(value).decode()
+
+def transactions_record_batch(txs):
+    """Turns decoded transactions into a RecordBatch of the Parquet transactions schema, flattened as in mempool_dump.py."""
+    columns = {f: [to_str(tx.get(f)) for tx in txs]
+               for f in TRANSACTION_FIELDS + SIGNATURE_FIELDS + ['_snapshot_timestamp', '_original_source_file', '_pool_status']}
+    columns['accessList'] = [
+        [to_str(item) for item in tx['accessList']] if tx.get('accessList') is not None else None
+        for tx in txs
+    ]
+    columns['authorizationList'] = [
+        [{f: to_str(auth.get(f)) for f in AUTHORIZATION_FIELDS} for auth in tx['authorizationList']]
+        if tx.get('authorizationList') is not None else None
+        for tx in txs
+    ]
+    return pa.RecordBatch.from_pydict(columns, schema=PARQUET_SCHEMAS['transactions'])
+
+def snapshots_record_batch(rows):
+    """Turns snapshot summary rows into a RecordBatch of the Parquet snapshots schema."""
+    return pa.RecordBatch.from_pylist(rows, schema=PARQUET_SCHEMAS['snapshots'])
+
+def read_zst_lines(input_file_path, chunk_size=1 << 20):
+    """
+    Yields the lines of a .zst file as bytes. Older mempool_dump.py files hold one zstd frame
+    per run, and only read() (not readinto/read1) continues across frames.
+    """
+    with open(input_file_path, 'rb') as fh:
+        reader = zstandard.ZstdDecompressor().stream_reader(fh, read_across_frames=True)
+        pending = b''
+        while True:
+            chunk = reader.read(chunk_size)
+            if not chunk:
+                break
+            lines = (pending + chunk).split(b'\n')
+            pending = lines.pop()
+            yield from lines
+        if pending:
+            yield pending
+
+def extract_and_write_txs(tx_group, status, tx_buf, outer_timestamp, input_file_path):
+    """Appends every transaction of a pending/queued group to tx_buf as one line and returns how many were written."""
+    if not tx_group:
+        return 0
+    # Metadata keys are spliced onto the raw transaction object, which is never decoded
+    suffix = orjson.dumps({
+        "_snapshot_timestamp": outer_timestamp,
+        "_original_source_file": input_file_path,
+        "_pool_status": status
+    }, option=orjson.OPT_APPEND_NEWLINE)[1:]
+    comma_suffix = b',' + suffix
+    # Locals for everything the per-transaction loop touches
+    view = memoryview
+    open_brace = OPEN_BRACE
+    whitespace = JSON_WHITESPACE
+    written = 0
+    for nonces in tx_group.values():
+        for tx_details in nonces.values():
+            # Copy straight from the decoded buffer, without intermediate bytes objects
+            tx_details = view(tx_details)
+            if tx_details[0] == open_brace:
+                end = len(tx_details) - 1
+                while tx_details[end - 1] in whitespace:
+                    end -= 1
+                tx_buf += tx_details[:end]
+                tx_buf += suffix if tx_details[end - 1] == open_brace else comma_suffix
+                written += 1
+    return written
+
+def collect_txs(tx_group, status, txs, outer_timestamp, input_file_path):
+    """Parquet counterpart of extract_and_write_txs: decodes each transaction of a group once into txs."""
+    if not tx_group:
+        return 0
+    loads = orjson.loads
+    view = memoryview
+    open_brace = OPEN_BRACE
+    written = 0
+    for nonces in tx_group.values():
+        for tx_details in nonces.values():
+            tx_details = view(tx_details)
+            if tx_details[0] == open_brace:
+                tx = loads(tx_details)
+                tx["_snapshot_timestamp"] = outer_timestamp
+                tx["_original_source_file"] = input_file_path
+                tx["_pool_status"] = status
+                txs.append(tx)
+                written += 1
+    return written
+
+def shred_lines(lines, first_line_number, input_file_path, output_format='jsonl', byte_offset=None):
+    """
+    Shreds a batch of log lines on a worker process. Returns the serialized
+    transaction and snapshot summary lines (or, for Parquet, a transactions
+    RecordBatch and the snapshot summary rows) with their counts, so the
+    parent process only has to write them out in order.
+    Batches read from a byte range pass its byte_offset, since their absolute
+    line numbers are unknown.
+    """
+    # Output accumulates in bytearrays and reaches the gzip writers as one chunk per batch;
+    # Parquet output collects decoded rows instead
+    parquet = output_format == 'parquet'
+    tx_buf = [] if parquet else bytearray()
+    snap_buf = [] if parquet else bytearray()
+    extract_txs = collect_txs if parquet else extract_and_write_txs
+    transactions_written = 0
+    snapshots_written = 0
+    decode_entry = LOG_ENTRY_DECODER.decode
+    dumps = orjson.dumps
+    append_newline = orjson.OPT_APPEND_NEWLINE
+
+    if byte_offset is None:
+        line_numbers = itertools.count(first_line_number)
+    else:
+        line_numbers = (f"{n} after byte {byte_offset}" for n in itertools.count(first_line_number))
+
+    # Lines stay bytes: the decoder reads UTF-8 and skips surrounding whitespace itself
+    for line_number, line in zip(line_numbers, lines):
+        if not line or line.isspace():
+            continue
+
+        if len(line) > 50 * 1024 * 1024:
+            print(f"WARNING: Line {line_number} is very large: {len(line) / (1024*1024):.2f} MB.")
+
+        try:
+            log_entry = decode_entry(line)
+        except msgspec.ValidationError:
+            # Snapshot of an unexpected shape: re-read it raw so the summary row is still written
+            log_entry = None
+        except msgspec.DecodeError as e:
+            print(f"Skipping malformed JSON line {line_number}: {e} - Line (start): {line[:200].strip().decode('utf-8', 'replace')}...")
+            continue
+        if log_entry is None:
+            try:
+                log_entry = RAW_LOG_ENTRY_DECODER.decode(line)
+            except msgspec.DecodeError as e:
+                print(f"Skipping malformed JSON line {line_number}: {e} - Line (start): {line[:200].strip().decode('utf-8', 'replace')}...")
+                continue
+
+        outer_timestamp = log_entry.timestamp
+        snapshot_field_value = log_entry.snapshot
+        pending_count_raw = log_entry.pending_count
+        queued_count_raw = log_entry.queued_count
+        
+        try:
+            pending_count = int(pending_count_raw)
+        except (ValueError, TypeError):
+            pending_count = 0
+        try:
+            queued_count = int(queued_count_raw)
+        except (ValueError, TypeError):
+            queued_count = 0
+            
+        snapshot_summary = {
+            "snapshot_timestamp": outer_timestamp,
+            "pending_count": pending_count,
+            "queued_count": queued_count,
+            "original_source_file": input_file_path
+        }
+        if parquet:
+            snap_buf.append(snapshot_summary)
+        else:
+            snap_buf += dumps(snapshot_summary, option=append_newline)
+        snapshots_written += 1
+
+        snapshot_data = None
+        # Decoded values are exact types, so identity checks are enough
+        snapshot_type = type(snapshot_field_value)
+        if snapshot_type is Snapshot:
+            snapshot_data = snapshot_field_value
+        elif snapshot_type is str: # Check if it's a string that needs parsing
+            if len(snapshot_field_value) > 200 * 1024 * 1024: 
+                 print(f"  WARNING: Inner snapshot JSON STRING at line {line_number} is extremely large: {len(snapshot_field_value) / (1024*1024):.2f} MB. Skipping parsing.")
+            else:
+                try:
+                    snapshot_data = SNAPSHOT_DECODER.decode(snapshot_field_value)
+                except msgspec.DecodeError as e:
+                    print(f"  Skipping malformed inner snapshot JSON STRING on line {line_number}: {e} - Snapshot (start): {snapshot_field_value[:200]}...")
+        elif snapshot_type is msgspec.Raw and bytes(memoryview(snapshot_field_value)[:1]) == b'{': 
+            try:
+                snapshot_data = SNAPSHOT_DECODER.decode(snapshot_field_value)
+            except msgspec.DecodeError as e:
+                print(f"  Skipping malformed inner snapshot on line {line_number}: {e} - Snapshot (start): {bytes(memoryview(snapshot_field_value)[:200])}...")
+        else:
+            if snapshot_type is msgspec.Raw:
+                snapshot_field_value = msgspec.json.decode(snapshot_field_value)
+            print(f"  Line {line_number}: snapshot field is neither STRING nor DICT (type: {type(snapshot_field_value)}). Skipping snapshot processing.")
+            pass
+
+
+        if snapshot_data: # proceed only if snapshot_data was successfully obtained
+            try:
+                transactions_written += extract_txs(snapshot_data.pending, 'pending', tx_buf, outer_timestamp, input_file_path)
+                transactions_written += extract_txs(snapshot_data.queued, 'queued', tx_buf, outer_timestamp, input_file_path)
+            except Exception as e_inner:
+                print(f"  Error processing inner snapshot data on line {line_number}: {e_inner} - Snapshot (type: {type(snapshot_data)}), Line (start): {line[:200].strip().decode('utf-8', 'replace')}...")
+
+    if parquet:
+        return transactions_record_batch(tx_buf), snap_buf, transactions_written, snapshots_written
+    return tx_buf, snap_buf, transactions_written, snapshots_written
+
+def iter_line_batches(infile, batch_bytes=SHRED_BATCH_BYTES):
+    """Groups input lines into batches of roughly batch_bytes, yielding (first_line_number, lines)."""
+    batch = []
+    batch_size = 0
+    first_line_number = 1
+    for line_number, line in enumerate(infile, 1):
+        if not batch:
+            first_line_number = line_number
+        batch.append(line)
+        batch_size += len(line)
+        if batch_size >= batch_bytes:
+            yield first_line_number, batch
+            batch = []
+            batch_size = 0
+    if batch:
+        yield first_line_number, batch
+
+def build_gzip_index(input_file_path, index_file_path):
+    """
+    Decompresses a .gz file once to save its seek index. Returns the
+    uncompressed offsets of the index's seek points and the uncompressed size.
+    """
+    with indexed_gzip.IndexedGzipFile(input_file_path, spacing=GZIP_INDEX_SPACING) as f:
+        f.build_full_index()
+        f.export_index(index_file_path)
+        seek_points = [offset for offset, _compressed_offset in f.seek_points()]
+        return seek_points, f.seek(0, os.SEEK_END)
+
+def read_line_range(f, start, end):
+    """Returns the lines of a seekable binary file that start within (start, end], or [0, end] for the first range."""
+    # Seeking exactly to start keeps .gz reads on an index seek point
+    f.seek(start)
+    if start > 0:
+        # The line at or across start belongs to the previous range. Snapshot lines can be longer
+        # than a whole range, so skip it piecewise and stop once it runs past the range's end
+        while True:
+            piece = f.readline(READ_BUFFER_SIZE)
+            if f.tell() > end:
+                return []
+            if not piece or piece[-1:] == b'\n':
+                break
+    lines = []
+    while f.tell() <= end:
+        line = f.readline()
+        if not line:
+            break
+        lines.append(line)
+    return lines
+
+def shred_byte_range(input_file_path, start, end, output_format='jsonl', index_file_path=None):
+    """Reads the lines starting within the byte range (start, end] of the (uncompressed) input and shreds them."""
+    if index_file_path is not None:
+        f = indexed_gzip.IndexedGzipFile(input_file_path, index_file=index_file_path)
+    else:
+        f = open(input_file_path, 'rb', buffering=READ_BUFFER_SIZE)
+    with f:
+        lines = read_line_range(f, start, end)
+    # Line numbers are only absolute in the first range
+    return shred_lines(lines, 1, input_file_path, output_format, byte_offset=start or None)
 
 def process_single_log_file_local(input_file_path, 
                                   output_dir_transactions, 
-                                  output_dir_snapshots):
+                                  output_dir_snapshots,
+                                  output_format='jsonl'):
     """
     Reads a single JSON log file from local disk, 
     shreds it, and writes individual transactions and snapshot summaries 
-    to new local gzipped JSON files.
+    to new local gzipped JSON files (or Parquet files with output_format='parquet').
     """
     print(f"Processing local file: {input_file_path}")
     
     base_filename = os.path.basename(input_file_path)
-    date_str_for_filename = "unknown_date" 
     partition_date_folder_name = "snapshot_date=unknown_date" 
 
-    try:
-        name_without_gz = base_filename.replace(".gz", "")
-        possible_date_str = os.path.splitext(name_without_gz)[0]
-        if os.path.splitext(possible_date_str)[1]:
-             possible_date_str = os.path.splitext(possible_date_str)[0]
-        
-        datetime.strptime(possible_date_str, '%Y-%m-%d') 
-        date_str_for_filename = possible_date_str
-        partition_date_folder_name = f"snapshot_date={possible_date_str}"
-        print(f"Successfully parsed date: {possible_date_str} from filename for partitioning.")
-    except ValueError:
+    date_match = DATE_RE.search(base_filename)
+    if date_match:
+        partition_date_folder_name = f"snapshot_date={date_match.group(1)}"
+        print(f"Successfully parsed date: {date_match.group(1)} from filename for partitioning.")
+    else:
         print(f"Could not parse YYYY-MM-DD from filename: {base_filename}. Using default partition: '{partition_date_folder_name}'.")
         
     transactions_partition_path = os.path.join(output_dir_transactions, partition_date_folder_name)
@@ -36,93 +418,88 @@ def process_single_log_file_local(input_file_path,
     os.makedirs(transactions_partition_path, exist_ok=True)
     os.makedirs(snapshots_partition_path, exist_ok=True)
 
-    safe_base_filename_part = "".join(c if c.isalnum() or c in ('_','-') else '_' for c in base_filename)
-    transactions_output_file = os.path.join(transactions_partition_path, f"part-{safe_base_filename_part}.jsonl.gz")
-    snapshots_output_file = os.path.join(snapshots_partition_path, f"part-{safe_base_filename_part}.jsonl.gz")
+    safe_base_filename_part = UNSAFE_FILENAME_CHARS_RE.sub('_', base_filename)
+    extension = "parquet" if output_format == 'parquet' else "jsonl.gz"
+    transactions_output_file = os.path.join(transactions_partition_path, f"part-{safe_base_filename_part}.{extension}")
+    snapshots_output_file = os.path.join(snapshots_partition_path, f"part-{safe_base_filename_part}.{extension}")
 
     transactions_written = 0
     snapshots_written = 0
 
+    if output_format == 'parquet' and pa is None:
+        print(f"Error processing file {input_file_path}: Parquet output requires 'pip install pyarrow'")
+        return
+
+    index_file_path = None
     try:
-        open_func = gzip.open if input_file_path.endswith('.gz') else open
-        
-        with open_func(input_file_path, 'rt', encoding='utf-8') as infile:
-            with gzip.open(transactions_output_file, 'wt', encoding='utf-8') as tf, \
-                 gzip.open(snapshots_output_file, 'wt', encoding='utf-8') as sf:
-
-                for line_number, line_str in enumerate(infile, 1):
-                    line_str = line_str.strip()
-                    if not line_str:
-                        continue
-
-                    if len(line_str) > 50 * 1024 * 1024:
-                        print(f"WARNING: Line {line_number} is very large: {len(line_str) / (1024*1024):.2f} MB.")
-
-                    try:
-                        raw_log_entry = json.loads(line_str)
-                    except json.JSONDecodeError as e:
-                        print(f"Skipping malformed JSON line {line_number}: {e} - Line (start): {line_str[:200]}...")
-                        continue
-
-                    outer_timestamp = raw_log_entry.get("timestamp")
-                    snapshot_field_value = raw_log_entry.get("snapshot")
-                    pending_count_raw = raw_log_entry.get("pending_count", 0)
-                    queued_count_raw = raw_log_entry.get("queued_count", 0)
-                    
-                    try:
-                        pending_count = int(pending_count_raw)
-                    except (ValueError, TypeError):
-                        pending_count = 0
-                    try:
-                        queued_count = int(queued_count_raw)
-                    except (ValueError, TypeError):
-                        queued_count = 0
-                        
-                    snapshot_summary = {
-                        "snapshot_timestamp": outer_timestamp,
-                        "pending_count": pending_count,
-                        "queued_count": queued_count,
-                        "original_source_file": input_file_path
-                    }
-                    sf.write(json.dumps(snapshot_summary) + '\n')
-                    snapshots_written += 1
-
-                    snapshot_data = None
-                    if isinstance(snapshot_field_value, str): # Check if it's a string that needs parsing
-                        if len(snapshot_field_value) > 200 * 1024 * 1024: 
-                             print(f"  WARNING: Inner snapshot JSON STRING at line {line_number} is extremely large: {len(snapshot_field_value) / (1024*1024):.2f} MB. Skipping parsing.")
+        with contextlib.ExitStack() as stack:
+            if input_file_path.endswith('.zst'):
+                if zstandard is None:
+                    print(f"Error processing file {input_file_path}: reading .zst files requires 'pip install zstandard'")
+                    return
+                infile = stack.enter_context(contextlib.closing(read_zst_lines(input_file_path)))
+            elif input_file_path.endswith('.gz') and (indexed_gzip is None or SHRED_WORKERS == 1):
+                # A lone worker gains nothing from byte ranges that would pay for a second decompression pass
+                infile = stack.enter_context(io.BufferedReader(gzip.open(input_file_path, 'rb'), buffer_size=READ_BUFFER_SIZE))
+            else:
+                # Seekable input: each worker reads its own byte range instead of the parent reading every line
+                infile = None
+                if input_file_path.endswith('.gz'):
+                    fd, index_file_path = tempfile.mkstemp(suffix='.gzidx')
+                    os.close(fd)
+                    # Ranges run between the index's seek points, so no worker inflates data it then discards
+                    range_starts, input_size = build_gzip_index(input_file_path, index_file_path)
+                else:
+                    input_size = os.path.getsize(input_file_path)
+                    range_starts = list(range(0, input_size, SHRED_BATCH_BYTES))
+
+            with open_output(transactions_output_file, output_format, 'transactions') as tf, \
+                 open_output(snapshots_output_file, output_format, 'snapshots') as sf:
+
+                with ProcessPoolExecutor(max_workers=SHRED_WORKERS) as executor:
+                    in_flight = deque()
+                    # A worker batch holds only a few multi-MB snapshots, so their rows are grouped here
+                    snapshot_rows = []
+
+                    def flush_snapshot_rows():
+                        if snapshot_rows:
+                            sf.write_batch(snapshots_record_batch(snapshot_rows))
+                            snapshot_rows.clear()
+
+                    def write_next_result():
+                        nonlocal transactions_written, snapshots_written
+                        tx_data, snap_data, tx_count, snap_count = in_flight.popleft().result()
+                        if output_format == 'parquet':
+                            if tx_data.num_rows:
+                                tf.write_batch(tx_data)
+                            snapshot_rows.extend(snap_data)
+                            if len(snapshot_rows) >= SNAPSHOT_ROWS_PER_GROUP:
+                                flush_snapshot_rows()
                         else:
-                            try:
-                                snapshot_data = json.loads(snapshot_field_value)
-                            except json.JSONDecodeError as e:
-                                print(f"  Skipping malformed inner snapshot JSON STRING on line {line_number}: {e} - Snapshot (start): {snapshot_field_value[:200]}...")
-                    elif isinstance(snapshot_field_value, dict): 
-                        snapshot_data = snapshot_field_value
+                            tf.write(tx_data)
+                            sf.write(snap_data)
+                        transactions_written += tx_count
+                        snapshots_written += snap_count
+
+                    # Results are written in submission order; a bounded queue keeps memory in check
+                    if infile is None:
+                        tasks = (
+                            (shred_byte_range, input_file_path, start, end, output_format, index_file_path)
+                            for start, end in zip(range_starts, range_starts[1:] + [input_size])
+                        )
                     else:
-                        print(f"  Line {line_number}: snapshot field is neither STRING nor DICT (type: {type(snapshot_field_value)}). Skipping snapshot processing.")
-                        pass
-
-
-                    if snapshot_data: # proceed only if snapshot_data was successfully obtained
-                        try:
-                            def extract_and_write_txs(tx_group, status):
-                                nonlocal transactions_written
-                                if tx_group and isinstance(tx_group, dict):
-                                    for _sender, nonces in tx_group.items():
-                                        if isinstance(nonces, dict):
-                                            for _nonce_key, tx_details in nonces.items():
-                                                if isinstance(tx_details, dict):
-                                                    tx_details["_snapshot_timestamp"] = outer_timestamp
-                                                    tx_details["_original_source_file"] = input_file_path
-                                                    tx_details["_pool_status"] = status
-                                                    tf.write(json.dumps(tx_details) + '\n')
-                                                    transactions_written +=1
-                            
-                            extract_and_write_txs(snapshot_data.get('pending'), 'pending')
-                            extract_and_write_txs(snapshot_data.get('queued'), 'queued')
-                        except Exception as e_inner:
-                            print(f"  Error processing inner snapshot data on line {line_number}: {e_inner} - Snapshot (type: {type(snapshot_field_value)}), Data (start): {str(snapshot_field_value)[:200]}...")
-        
+                        tasks = (
+                            (shred_lines, lines, first_line_number, input_file_path, output_format)
+                            for first_line_number, lines in iter_line_batches(infile)
+                        )
+                    for task in tasks:
+                        in_flight.append(executor.submit(*task))
+                        if len(in_flight) >= 2 * SHRED_WORKERS:
+                            write_next_result()
+                    while in_flight:
+                        write_next_result()
+                    flush_snapshot_rows()
+
         print(f"Finished processing. Wrote {transactions_written} transactions to {transactions_output_file}")
         print(f"Wrote {snapshots_written} snapshot summaries to {snapshots_output_file}")
 
@@ -130,20 +507,26 @@ def process_single_log_file_local(input_file_path,
         print(f"Error processing file {input_file_path}: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        if index_file_path is not None:
+            os.remove(index_file_path)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 4:
-        print("Usage: python your_local_shredder_script.py <local_input_file_path> <local_output_dir_transactions> <local_output_dir_snapshots>")
+    output_format = "parquet" if "--parquet" in sys.argv[1:] else "jsonl"
+    args = [a for a in sys.argv[1:] if a != "--parquet"]
+    if len(args) != 3:
+        print("Usage: python your_local_shredder_script.py [--parquet] <local_input_file_path> <local_output_dir_transactions> <local_output_dir_snapshots>")
         print("Example: python your_local_shredder_script.py ./small-test.log ./shredded_output/transactions ./shredded_output/snapshots")
+        print("--parquet writes zstd-compressed Parquet (requires pyarrow) for the converter's --parquet-input instead of gzipped JSON lines.")
         sys.exit(1)
 
-    local_input_file_arg = sys.argv[1].strip()
-    local_output_transactions_arg = sys.argv[2].strip()
-    local_output_snapshots_arg = sys.argv[3].strip()
+    local_input_file_arg = args[0].strip()
+    local_output_transactions_arg = args[1].strip()
+    local_output_snapshots_arg = args[2].strip()
     
     os.makedirs(local_output_transactions_arg, exist_ok=True)
     os.makedirs(local_output_snapshots_arg, exist_ok=True)
 
-    process_single_log_file_local(local_input_file_arg, local_output_transactions_arg, local_output_snapshots_arg)
+    process_single_log_file_local(local_input_file_arg, local_output_transactions_arg, local_output_snapshots_arg, output_format)
     
     print("Local shredding process finished.")
\ No newline at end of file
@@ -1,11 +1,43 @@
 #!/usr/bin/env python3
 import sys
 import os
+import io
 import re
-import json
+import mmap
 import sqlite3
-import gzip
+import zlib
 from collections import defaultdict
+from typing import Optional
+
+import msgspec
+
+try:
+    from isal import igzip as gzip, isal_zlib
+    # truncated or corrupted .gz inputs; caught per file so one bad log doesn't lose the others
+    READ_ERRORS = (OSError, EOFError, zlib.error, isal_zlib.error)
+except ImportError:
+    import gzip
+    READ_ERRORS = (OSError, EOFError, zlib.error)
+
+READ_BUFFER_SIZE = 128 * 1024
+# Characters of decoded log text scanned per step
+STREAM_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Every memstats record starts with its timestamp
+LOG_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}[+-]\d{2}:\d{2})')
+LOG_BYTES_PATTERN = re.compile(LOG_PATTERN.pattern.encode())
+TIMESTAMP_LENGTH = len("2025-01-01T00:00:00+00:00")
+TIMESTAMP_T_OFFSET = 10
+
+
+class MemStats(msgspec.Struct):
+    """The runtime.MemStats fields we store; every other field is skipped without being decoded."""
+    Alloc: Optional[int] = None
+    Sys: Optional[int] = None
+    NumGC: Optional[int] = None
+
+# Integers are parsed by msgspec itself; strict=False also accepts numeric strings, like int() did
+MEMSTATS_DECODER = msgspec.json.Decoder(MemStats, strict=False)
 
 # Configuration 
 def setup_database(db_path):
@@ -25,69 +57,124 @@ def setup_database(db_path):
     print("INFO: Database setup complete.")
 
 
-def process_memstats_file(db_path, log_file_path):
+def open_database(db_path):
+    """Opens the single connection shared by all files, tuned for one large bulk load."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-262144")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute(f"PRAGMA mmap_size={1 << 30}")
+    return conn
+
+
+def find_timestamps(content, pattern=LOG_PATTERN, marker='T'):
+    """
+    Same matches as pattern.finditer(content), but lets content.find jump between
+    'T' characters and only runs the regex where a timestamp's 'T' could be.
+    Pass LOG_BYTES_PATTERN and b'T' for bytes-like content such as an mmap.
+    """
+    find = content.find
+    match = pattern.match
+    i = find(marker, TIMESTAMP_T_OFFSET)
+    while i >= 0:
+        m = match(content, i - TIMESTAMP_T_OFFSET)
+        if m:
+            yield m
+            i = find(marker, m.end() + TIMESTAMP_T_OFFSET)
+        else:
+            i = find(marker, i + 1)
+
+
+def iter_memstats_entries(f):
+    """
+    Streams (timestamp, json_blob) pairs from a text file object, keeping only
+    the unfinished record after the last timestamp between chunks.
     """
-    Processes a single memstats log file by splitting its content by timestamp
+    pending = ''
+    while True:
+        chunk = f.read(STREAM_CHUNK_SIZE)
+        content = pending + chunk
+        last = None
+        for match in find_timestamps(content):
+            if last is not None:
+                yield last.group(1), content[last.end():match.start()]
+            last = match
+        if not chunk:
+            if last is not None:
+                yield last.group(1), content[last.end():]
+            return
+        # Before the first timestamp, only keep enough text for one cut at the chunk boundary
+        pending = content[last.start():] if last is not None else content[-(TIMESTAMP_LENGTH - 1):]
+
+
+def iter_memstats_buffer_entries(buf):
+    """Yields (timestamp, json_blob) pairs from a whole in-memory or mmapped log."""
+    last = None
+    for match in find_timestamps(buf, LOG_BYTES_PATTERN, b'T'):
+        if last is not None:
+            yield last.group(1).decode(), buf[last.end():match.start()]
+        last = match
+    if last is not None:
+        yield last.group(1).decode(), buf[last.end():]
+
+
+def read_memstats_entries(log_file_path):
+    """Streams gzipped logs through the text decoder; scans uncompressed logs in place."""
+    if log_file_path.endswith('.gz'):
+        raw = io.BufferedReader(gzip.open(log_file_path, 'rb'), buffer_size=READ_BUFFER_SIZE)
+        with io.TextIOWrapper(raw, encoding='utf-8', errors='ignore') as f:
+            yield from iter_memstats_entries(f)
+    elif os.path.getsize(log_file_path) > 0:
+        with open(log_file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from iter_memstats_buffer_entries(mm)
+
+
+def iter_memstats_records(log_file_path, source_filename):
+    """Yields memstats table rows for every record with Alloc, Sys and NumGC set."""
+    decode = MEMSTATS_DECODER.decode
+    for timestamp_str, json_blob in read_memstats_entries(log_file_path):
+        try:
+            data = decode(json_blob)
+        except msgspec.DecodeError:
+            continue
+
+        alloc = data.Alloc
+        sys_mem = data.Sys
+        num_gc = data.NumGC
+
+        if alloc is not None and sys_mem is not None and num_gc is not None:
+            yield (timestamp_str, alloc, sys_mem, num_gc, source_filename)
+
+
+def process_memstats_file(conn, log_file_path):
+    """
+    Processes a single memstats log file by streaming it record by record (each
+    record starts with a timestamp). Rows go from the parser straight into one
+    executemany call on conn, inside the caller's transaction.
     """
     print(f"INFO: Processing file: {log_file_path}")
     
-    records_to_insert = []
+    records_found = 0
     source_filename = os.path.basename(log_file_path)
 
-    # This pattern will be used to split the entire file content into records
-    log_pattern = re.compile(r'(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}[+-]\d{2}:\d{2})')
-
-    open_func = gzip.open if log_file_path.endswith('.gz') else open
-    
-    with open_func(log_file_path, 'rt', encoding='utf-8', errors='ignore') as f:
-        content = f.read()
-        
-        # Split the file content by the timestamp pattern.
-        entries = log_pattern.split(content)
-        
-        # The first element is usually an empty string before the first timestamp
-        if entries and not entries[0].strip():
-            entries = entries[1:]
-        
-        # Process entries in pairs (timestamp, json_blob)
-        for i in range(0, len(entries), 2):
-            if i + 1 >= len(entries):
-                continue
-
-            timestamp_str = entries[i]
-            json_blob = entries[i+1].strip()
-            
-            try:
-                data = json.loads(json_blob)
-                
-                alloc = data.get("Alloc")
-                sys_mem = data.get("Sys")
-                num_gc = data.get("NumGC")
-                
-                if alloc is not None and sys_mem is not None and num_gc is not None:
-                    records_to_insert.append((
-                        timestamp_str,
-                        int(alloc),
-                        int(sys_mem),
-                        int(num_gc),
-                        source_filename
-                    ))
-            except json.JSONDecodeError:
-                continue
-    
-    if not records_to_insert:
-        print(f"INFO: No valid memstats found in {log_file_path}.")
-        return
+    def count_records(records):
+        nonlocal records_found
+        for record in records:
+            records_found += 1
+            yield record
 
     try:
-        with sqlite3.connect(db_path) as conn:
-            cursor = conn.cursor()
-            cursor.executemany("INSERT OR IGNORE INTO memstats VALUES (?, ?, ?, ?, ?)", records_to_insert)
-            conn.commit()
-            print(f"INFO: Inserted/ignored {len(records_to_insert)} memstats records from {source_filename}.")
+        conn.executemany("INSERT OR IGNORE INTO memstats VALUES (?, ?, ?, ?, ?)",
+                         count_records(iter_memstats_records(log_file_path, source_filename)))
     except sqlite3.Error as e:
         print(f"ERROR: Failed to insert data for {log_file_path}. Error: {e}")
-        
+
+    if not records_found:
+        print(f"INFO: No valid memstats found in {log_file_path}.")
+        return
+
+    print(f"INFO: Inserted/ignored {records_found} memstats records from {source_filename}.")
     print(f"INFO: Finished processing: {log_file_path}")
 
 
@@ -124,8 +211,20 @@ if __name__ == "__main__":
     
     print(f"INFO: Found {len(log_files)} log files to process.")
     
-    for file_path in log_files:
-        process_memstats_file(db_file_path, file_path)
+    conn = open_database(db_file_path)
+    try:
+        conn.execute("BEGIN")
+        for file_path in log_files:
+            try:
+                process_memstats_file(conn, file_path)
+            except READ_ERRORS as e:
+                # e.g. a truncated .gz still being written; the other files' rows are kept
+                print(f"ERROR: Failed to read {file_path}. Error: {e}")
+        conn.execute("COMMIT")
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.close()
         
     create_indexes(db_file_path)
     